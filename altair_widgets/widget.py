@@ -1,11 +1,14 @@
+import functools
 import io
 import sys
+import threading
 from warnings import warn
 
 import ipywidgets as widgets
 import pandas as pd
 from ipywidgets import Layout
-from IPython.display import display, clear_output, display_pretty, HTML, Image, SVG
+from IPython.core.formatters import format_display_data
+from IPython.display import display, display_pretty, HTML, Image, SVG
 
 import altair
 
@@ -23,6 +26,21 @@ def interact_with(df, ndims=3, **kwargs):
         The number of dimensions wished to encode at start (the number of rows
         with encoding/data/function/data_type).
 
+    debounce_ms : int, optional
+        Re-plot only after the controls have been idle for this many
+        milliseconds. Use 0 to re-plot on every change.
+
+    sample : int, optional
+        Plot a random sample of this many rows if the DataFrame is larger. The
+        sample is drawn once and used for every plot.
+
+    data_url : bool, optional
+        If the DataFrame has more rows than altair's default data transformer
+        embeds (its ``max_rows``, 5000 unless changed), write it once to a
+        JSON file in the working directory and plot it by URL. The file is not
+        removed afterwards. Classic Notebook serves the relative URL, other
+        frontends such as JupyterLab may not.
+
     Notes
     -----
     In the Jupyter notebook, display a widget to allow you to selectively plot
@@ -40,12 +58,15 @@ class Interact:
 
     Public member functions
     -----------------------
-    - Interact.__init__(self, df, ndims=3, show=True)
+    - Interact.__init__(self, df, ndims=3, show=True, debounce_ms=200,
+                        sample=None, data_url=False)
     - Interact.plot(self, settings, show=True):
 
     """
 
-    def __init__(self, df, ndims=3, show=True):
+    def __init__(
+        self, df, ndims=3, show=True, debounce_ms=200, sample=None, data_url=False
+    ):
         if not isinstance(df, pd.core.frame.DataFrame):
             raise ValueError("Interact takes a DataFrame as input")
 
@@ -57,60 +78,102 @@ class Interact:
                 "https://github.com/altair-viz/altair_widgets/blob/master/README.md##google-colab"
             )
 
-        columns = [None] + _get_columns(df)
-        #  columns = _get_columns(df)
-        self.columns = columns
+        # The options of the "encode" dropdowns, one tuple shared by all of
+        # them. Index.tolist() converts the labels without going through the
+        # columns; column-wise work added later should likewise avoid building
+        # a Series per column (prefer itertuples() over iterrows()), which is
+        # slow and memory hungry on wide frames
+        self.columns = tuple([None] + df.columns.tolist() + ["*"])
         encodings = _get_encodings()
         self.df = df
+        if sample and len(df) > sample:
+            self._plot_df = df.sample(sample, random_state=0)
+        else:
+            self._plot_df = df
+        self._chart_base, self._field_types = _base_chart(self._plot_df, data_url)
         encodings = [{"encoding": encoding} for encoding in encodings[:ndims]]
         self.settings = {"mark": {"mark": "mark_point"}, "encodings": encodings}
 
+        # The arguments to the altair calls, kept in sync with self.settings
+        self._encoded_kwargs = {}
+        self._mark_name = "mark_point"
+        self._mark_opts = {}
+        # The mark_* methods of self._chart_base that have been used
+        self._mark_fn_cache = {}
+
+        # The settings the current chart was rendered from
+        self._last_plot_key = None
+        # Renders may run on the debounce timer's thread
+        self._render_lock = threading.Lock()
+
+        # Rapid changes to the controls only trigger one re-plot
+        self._debounced_render = debounce(debounce_ms / 1000.0)(
+            self._render_if_changed
+        )
+
+        # The JupyterChart the plots are rendered in (altair>=5.1)
+        self._jchart = None
+        self._use_jchart = hasattr(altair, "JupyterChart")
+
+        # The "options" controllers of each row, by option
+        self._adv_controllers = {}
+        # True while the controllers are being set from self.settings
+        self._syncing = False
+
         self.controller = self._generate_controller(ndims)
+        # The chart is shown here, so only this output is ever cleared
+        self._out = widgets.Output()
         self.show = show
         if self.show:
-            display(self.controller)
+            display(self.controller, self._out)
 
         self.plot(show=show)
 
-    def _show_advanced(self, button, disable=1):
+    def _show_advanced(self, row, button, disable=1):
         """
-        Toggles the "options" items.
+        Toggles the "options" items of a row.
 
         """
-        if "mark" in button.title:
-            disable = 2
-
-        defaults = {
-            "log": False,
-            "bin": False,
-            "scale": "linear",
-            "type": "auto detect",
-            "aggregate": None,
-            "zero": True,
-            "color": None,
-            "applyColorToBackground": False,
-            "shortTimeLabels": False,
-        }
-
-        row = button.row
-        encoding = self.controller.children[row].children[disable].value
-        adv = _get_advanced_settings(encoding)
-        controllers = [_controllers_for(a) for a in adv]
-        for c in controllers:
-            if c.title in self.settings["encodings"][row]:
-                c.value = self.settings["encodings"][row][c.title]
+        shelf = self.controller.children[row]
+        box = shelf.children[-1]
+        hidden = box.layout.display == "none"
+        # Don't allow the encoding to change while its options are shown
+        shelf.children[disable].disabled = hidden
+        if hidden:
+            if row == -1:
+                current = self.settings["mark"]
             else:
-                c.value = defaults[c.title]
-            c.row = row
-            c.observe(self._update, names="value")
-
-        if False:
-            visible = self.controller.children[row].children[-1].layout.visiblility
-            visible = bool(visible)
-            self.controller.children[row].children[disable].disabled = not visible
-            self.controller.children[row].children[-1].visible = not visible
-            controllers = controllers if not visible else []
-            self.controller.children[row].children[-1].children = controllers
+                current = self.settings["encodings"][row]
+            shown = _get_advanced_settings(shelf.children[disable].value)
+            # The settings may have been changed since the controllers were
+            # last used, e.g. by assigning self.settings and calling plot()
+            self._syncing = True
+            try:
+                for title, c in self._adv_controllers[row].items():
+                    if title in shown:
+                        c.value = current.get(title, _DEFAULTS[title])
+                    c.layout.display = "flex" if title in shown else "none"
+            finally:
+                self._syncing = False
+        box.layout.display = "flex" if hidden else "none"
+
+    def _create_advanced(self, row, options):
+        """
+        Creates the hidden "options" box of a row, with a controller for every
+        option the row can have. _show_advanced only shows the ones that apply.
+
+        """
+        controllers = {}
+        for opt in options:
+            c = _controllers_for(opt)
+            c.value = _DEFAULTS[opt]
+            c.layout.display = "none"
+            self._observe(c, row, opt)
+            controllers[opt] = c
+        self._adv_controllers[row] = controllers
+        return widgets.VBox(
+            children=list(controllers.values()), layout=Layout(display="none")
+        )
 
     def _create_shelf(self, i=0):
         """
@@ -126,103 +189,174 @@ class Interact:
         )
         encoding.layout.width = "20%"
 
-        adv = widgets.VBox(
-            children=[], visible=False, layout=Layout(visibility="hidden")
-        )
+        adv = self._create_advanced(i, _ENCODING_OPTIONS)
 
         button = widgets.Button(description="options", disabled=True)
-        button.on_click(self._show_advanced)
+        button.on_click(functools.partial(self._show_advanced, i))
         button.layout.width = "10%"
 
-        # The callbacks when the button is clicked
-        encoding.observe(self._update, names="value")
-        cols.observe(self._update, names="value")
-
-        # Making sure we know what row we're in in the callbacks
-        encoding.row = cols.row = button.row = adv.row = i
-
-        # Have the titles so we know what button we're editing
-        encoding.title = "encoding"
-        cols.title = "field"
-        button.title = "button"
-        adv.title = "advanced"
+        # The callbacks when the value changes
+        self._observe(encoding, i, "encoding")
+        self._observe(cols, i, "field")
 
         return widgets.HBox([cols, encoding, button, adv])
 
-    def _update(self, event):
+    def _observe(self, widget, row, title):
         """
-        Given a button-clicking event, update the encoding settings.
+        Calls _on_change with the row and setting title when the value of the
+        widget changes.
 
-        Parameters
-        ----------
-        event : dict
-            Dictionary describing event. Assumed to have keys ['owner', 'new',
-            'old'] with the key corresponding to owner having properties [row,
-            title, value]
+        """
+        widget.observe(
+            functools.partial(self._on_change, row, title),
+            names="value",
+            type="change",
+        )
+
+    def _on_change(self, index, title, event):
+        """
+        Update setting ``title`` of row ``index`` (-1 for the mark) from a
+        change event with keys ['new', 'old'].
 
         Plots the function at the end of the update (this function is called on
         click).
         """
-        index = event["owner"].row
-        title = event["owner"].title
-        value = event["owner"].value
+        if self._syncing or event["new"] == event["old"]:
+            return
+
+        value = event["new"]
         if index == -1:
-            self.settings["mark"][title] = event["new"]
+            settings = self.settings["mark"]
         else:
-            if title == "type" and "auto" in value:
-                self.settings["encodings"][index].pop("type", None)
-            if title == "text":
-                if value is "":
-                    self.settings["encodings"][index].pop("text", None)
-                else:
-                    self.settings["encodings"][index]["field"] = value
+            settings = self.settings["encodings"][index]
+        before = dict(settings)
+
+        if index == -1:
+            settings[title] = value
+        elif title == "type" and "auto" in value:
+            settings.pop("type", None)
+        elif title == "text":
+            if not value:
+                settings.pop("field", None)
+                settings.pop("text", None)
             else:
-                if event["new"] is None:
-                    self.settings["encodings"][index].pop(title)
-                else:
-                    self.settings["encodings"][index][title] = event["new"]
-        self.plot(self.settings)
+                settings["field"] = value
+        elif value is None:
+            settings.pop(title, None)
+        else:
+            settings[title] = value
+
+        if settings == before:
+            # Nothing to re-plot
+            return
+
+        # Mark events only resync the mark. Encoding events rebuild every
+        # encoding, as several rows may use the same one
+        if index == -1:
+            self._sync_mark()
+        else:
+            self._sync_encodings()
+        # The timer thread only gets a copy, the callbacks keep mutating these
+        self._debounced_render(self._snapshot())
+
+    def _sync_mark(self):
+        mark = self.settings["mark"]
+        self._mark_name = mark["mark"]
+        self._mark_opts = {k: v for k, v in mark.items() if k != "mark"}
+
+    def _sync_encodings(self):
+        self._encoded_kwargs = {}
+        for e in self.settings["encodings"]:
+            command = _get_plot_command(e, self._field_types)
+            if command is not None:
+                self._encoded_kwargs[_ENC_KWARG[e["encoding"]]] = command
 
     def plot(self, show=True):
-        kwargs = {
-            e["encoding"]: _get_plot_command(e) for e in self.settings["encodings"]
-        }
-        kwargs = {k: v for k, v in kwargs.items() if v is not None}
-
-        mark_opts = {k: v for k, v in self.settings["mark"].items()}
-        mark = mark_opts.pop("mark")
-        Chart_mark = getattr(altair.Chart(self.df), mark)
-        self.chart = Chart_mark(**mark_opts).encode(**kwargs)
+        """
+        Plot the chart described by ``self.settings``.
+
+        """
+        # A pending re-plot would overwrite this one with older settings
+        self._debounced_render.cancel()
+        self._sync_mark()
+        self._sync_encodings()
+        self._render(self._snapshot(), show=show)
+
+    def _snapshot(self):
+        """
+        A copy of everything _render reads, so that it doesn't share any state
+        with the widget callbacks.
+
+        """
+        mark = tuple(sorted(self.settings["mark"].items()))
+        encodings = tuple(tuple(sorted(e.items())) for e in self.settings["encodings"])
+        return (
+            (mark, encodings),
+            self._mark_name,
+            dict(self._mark_opts),
+            dict(self._encoded_kwargs),
+        )
+
+    def _render_if_changed(self, snapshot):
+        with self._render_lock:
+            if snapshot[0] != self._last_plot_key:
+                self._render_locked(snapshot, True)
+
+    def _render(self, snapshot, show=True):
+        with self._render_lock:
+            self._render_locked(snapshot, show)
+
+    def _render_locked(self, snapshot, show):
+        key, mark_name, mark_opts, encoded_kwargs = snapshot
+        Chart_mark = self._mark_fn_cache.get(mark_name)
+        if Chart_mark is None:
+            Chart_mark = getattr(self._chart_base, mark_name)
+            self._mark_fn_cache[mark_name] = Chart_mark
+        self.chart = Chart_mark(**mark_opts).encode(**encoded_kwargs)
         if show and self.show:
-            clear_output()
-            display("Updating...")
-            with io.StringIO() as f:
-                self.chart.save(f, format="svg")
-                f.seek(0)
-                html = f.read()
-            clear_output()
-            display(self.controller)
-            display(SVG(html))
+            self._display_chart()
+        # Only once the chart is built and shown, so that a failed render is
+        # retried by the next change
+        self._last_plot_key = key
+
+    def _display_chart(self):
+        if self._jchart is not None:
+            # Vega patches the view that is already displayed
+            self._jchart.chart = self.chart
+            return
+        if self._use_jchart:
+            try:
+                self._jchart = altair.JupyterChart(self.chart)
+            except ImportError:
+                # anywidget is not installed
+                self._use_jchart = False
+            else:
+                self._out.outputs = (_display_data(self._jchart),)
+                return
+
+        with io.StringIO() as f:
+            self.chart.save(f, format="svg")
+            f.seek(0)
+            html = f.read()
+        # Replacing the outputs, rather than clearing and appending, swaps the
+        # charts without a blank flash. Unlike clear_output(), which enters
+        # "with self._out", it is also safe from the debounce timer's thread
+        self._out.outputs = (_display_data(SVG(html)),)
 
     def _generate_controller(self, ndims):
         marks = _get_marks()
         # mark button
         mark_choose = widgets.Dropdown(options=marks, description="Marks")
-        mark_choose.observe(self._update, names="value")
+        self._observe(mark_choose, -1, "mark")
         mark_choose.layout.width = "20%"
-        mark_choose.row = -1
-        mark_choose.title = "mark"
 
         # mark options button
         mark_but = widgets.Button(description="options")
         mark_but.layout.width = "10%"
-        mark_but.row = -1
-        mark_but.title = "mark_button"
 
         # Mark options
-        mark_opt = widgets.VBox(children=[], visible=False)
-        mark_but.on_click(self._show_advanced)
-        mark_opt.title = "mark_options"
+        mark_opt = self._create_advanced(-1, _MARK_OPTIONS)
+        mark_but.on_click(functools.partial(self._show_advanced, -1))
         mark_opt.layout.width = "300px"
 
         add_dim = widgets.Button(description="add encoding")
@@ -247,17 +381,87 @@ class Interact:
         self.plot(self.settings)
 
 
-def _get_columns(df):
-    return list(df.columns) + ["*"]
+def debounce(wait):
+    """
+    Decorator that postpones calling the function until ``wait`` seconds have
+    passed since the last call. Pending calls are cancelled by newer ones, or
+    by calling ``cancel()`` on the decorated function.
 
+    If ``wait`` is zero the function is called straight away.
+    """
 
-def _get_types():
-    return list(altair.utils.core.TYPECODE_MAP.keys())
+    def decorator(fn):
+        timer = [None]
 
+        @functools.wraps(fn)
+        def debounced(*args, **kwargs):
+            if wait <= 0:
+                return fn(*args, **kwargs)
+            cancel()
+            timer[0] = threading.Timer(wait, fn, args=args, kwargs=kwargs)
+            timer[0].start()
 
-def _get_encodings():
-    # All the subclasses of altair.FieldChannelMixin, lowercase
-    encodings = []
+        def cancel():
+            if timer[0] is not None:
+                timer[0].cancel()
+
+        debounced.cancel = cancel
+        return debounced
+
+    return decorator
+
+
+def _display_data(obj):
+    """
+    The entry of an Output widget's ``outputs`` that displays ``obj``.
+    """
+    data, metadata = format_display_data(obj)
+    return {"output_type": "display_data", "data": data, "metadata": metadata}
+
+
+# altair's default data transformer refuses to embed more rows than this,
+# unless its max_rows option says otherwise
+_MAX_INLINE_ROWS = 5000
+
+
+def _infer_type(column):
+    core = altair.utils.core
+    if hasattr(core, "infer_vegalite_type"):
+        return core.infer_vegalite_type(column)
+    return core.infer_vegalite_type_for_pandas(column)
+
+
+def _base_chart(df, data_url=False):
+    """
+    Returns the chart every plot is built from, and the encoding type of each
+    column if altair can't infer them from the chart's data.
+
+    With ``data_url``, DataFrames too large for altair's default data
+    transformer are written to disk once and referenced by URL, so that they
+    aren't serialized into the spec on every plot. Any other transformer
+    (json, vegafusion, ...) is left to handle the data itself.
+    """
+    transformers = altair.data_transformers
+    max_rows = transformers.options.get("max_rows", _MAX_INLINE_ROWS)
+    if (
+        not data_url
+        or transformers.active != "default"
+        or max_rows is None
+        or len(df) <= max_rows
+    ):
+        return altair.Chart(df), None
+
+    types = {}
+    for col in df.columns:
+        t = _infer_type(df[col])
+        # infer_vegalite_type may also give a (type, sort) tuple
+        types[col] = t[0] if isinstance(t, tuple) else t
+    return altair.Chart(altair.UrlData(**altair.to_json(df))), types
+
+
+def _find_encodings():
+    # All the subclasses of altair.FieldChannelMixin, by lowercase name
+    encodings = {}
     for name in dir(altair):
         value = getattr(altair, name)
         if (
@@ -265,15 +469,38 @@ def _get_encodings():
             and issubclass(value, altair.FieldChannelMixin)
             and name != "FieldChannelMixin"
         ):
-            encodings.append(name.lower())
-    # reorder to have the most useful encodings at the top
-    top = ["x", "y", "color"]
-    others = sorted([e for e in encodings if e not in top])
-    return top + others
+            encodings[name.lower()] = value
+    return encodings
+
+
+# These only depend on the installed altair, so they're found once at import
+_ENC_CTOR = _find_encodings()
+# The Chart.encode() keyword of each encoding, e.g. "strokeDash" for "strokedash"
+_ENC_KWARG = {
+    e: getattr(cls, "_encoding_name", cls.__name__[0].lower() + cls.__name__[1:])
+    for e, cls in _ENC_CTOR.items()
+}
+# reorder to have the most useful encodings at the top
+_ENCODINGS = ("x", "y", "color") + tuple(
+    sorted(e for e in _ENC_CTOR if e not in ("x", "y", "color"))
+)
+_TYPES = tuple(altair.utils.core.TYPECODE_MAP.keys())
+_FUNCTIONS = tuple(altair.utils.core.AGGREGATES)
+_MARKS = tuple(
+    m for m in dir(altair.mixins.MarkMethodMixin()) if m.startswith("mark_")
+)
+
+
+def _get_types():
+    return _TYPES
+
+
+def _get_encodings():
+    return _ENCODINGS
 
 
 def _get_functions():
-    return altair.utils.core.AGGREGATES
+    return _FUNCTIONS
 
 
 def _get_marks():
@@ -281,28 +508,79 @@ def _get_marks():
     >>> _get_marks()[0]
     'mark_point'
     """
-    return [m for m in dir(altair.mixins.MarkMethodMixin()) if m.startswith("mark_")]
+    return _MARKS
 
 
 def _get_mark_params():
-    return ["color", "applyColorToBackground", "shortTimeLabels"]
+    return ("color", "applyColorToBackground", "shortTimeLabels")
+
+
+_ADV_SETTINGS = {e: ("type", "bin", "aggregate") for e in _ENCODINGS}
+_ADV_SETTINGS.update(
+    {
+        "x": ("type", "bin", "aggregate", "zero", "scale"),
+        "y": ("type", "bin", "aggregate", "zero", "scale"),
+        "text": ("type", "bin", "aggregate", "text"),
+    }
+)
+_ADV_SETTINGS.update({mark: _get_mark_params() for mark in _MARKS})
 
 
 def _get_advanced_settings(e):
     """
-    Given string encoding (e.g. 'x'), returns a dictionary
+    Given string encoding (e.g. 'x'), returns a tuple of its options
 
     >>> _get_advanced_settings('x')
-    ['type', 'bin', 'aggregate', 'zero', 'scale']
+    ('type', 'bin', 'aggregate', 'zero', 'scale')
     """
-    adv_settings = {e: ["type", "bin", "aggregate"] for e in _get_encodings()}
-    adv_settings["x"] += ["zero", "scale"]
-    adv_settings["y"] += ["zero", "scale"]
-    adv_settings["text"] += ["text"]
-
-    mark_settings = {mark: _get_mark_params() for mark in _get_marks()}
-    adv_settings.update(mark_settings)
-    return adv_settings[e]
+    return _ADV_SETTINGS[e]
+
+
+def _union(options):
+    union = []
+    for opts in options:
+        union += [o for o in opts if o not in union]
+    return tuple(union)
+
+
+# Every option an encoding/mark can have, in order of first appearance
+_ENCODING_OPTIONS = _union(_ADV_SETTINGS[e] for e in _ENCODINGS)
+_MARK_OPTIONS = _union(_ADV_SETTINGS[m] for m in _MARKS)
+
+# The values of the options when they're not in the settings
+_DEFAULTS = {
+    "log": False,
+    "bin": False,
+    "scale": "linear",
+    "type": "auto detect",
+    "aggregate": None,
+    "zero": True,
+    "color": None,
+    "applyColorToBackground": False,
+    "shortTimeLabels": False,
+    "text": "",
+}
+
+_COLORS = [None, "blue", "red", "green", "black"]
+
+# Builds a controller for each advanced option; only the one asked for is made
+_FACTORIES = {
+    "type": lambda: widgets.Dropdown(
+        options=["auto detect"] + list(_get_types()), description="type"
+    ),
+    "bin": lambda: widgets.Checkbox(description="bin"),
+    "aggregate": lambda: widgets.Dropdown(
+        options=[None] + list(_get_functions()), description="aggregate"
+    ),
+    "zero": lambda: widgets.Checkbox(description="zero"),
+    "text": lambda: widgets.Text(description="text value"),
+    "scale": lambda: widgets.Dropdown(options=["linear", "log"], description="scale"),
+    "color": lambda: widgets.Dropdown(options=_COLORS, description="main color"),
+    "applyColorToBackground": lambda: widgets.Checkbox(
+        description="applyColorToBackground"
+    ),
+    "shortTimeLabels": lambda: widgets.Checkbox(description="shortTimeLabels"),
+}
 
 
 def _controllers_for(opt):
@@ -311,57 +589,57 @@ def _controllers_for(opt):
     command.
 
     """
-    colors = [None, "blue", "red", "green", "black"]
-    controllers = {
-        "type": widgets.Dropdown(
-            options=["auto detect"] + _get_types(), description="type"
-        ),
-        "bin": widgets.Checkbox(description="bin"),
-        "aggregate": widgets.Dropdown(
-            options=[None] + _get_functions(), description="aggregate"
-        ),
-        "zero": widgets.Checkbox(description="zero"),
-        "text": widgets.Text(description="text value"),
-        "scale": widgets.Dropdown(options=["linear", "log"], description="scale"),
-        "color": widgets.Dropdown(options=colors, description="main color"),
-        "applyColorToBackground": widgets.Checkbox(
-            description="applyColorToBackground"
-        ),
-        "shortTimeLabels": widgets.Checkbox(description="shortTimeLabels"),
-    }
+    controller = _FACTORIES[opt]()
+    if isinstance(controller, widgets.Checkbox):
+        controller.layout.max_width = "200ex"
+    return controller
 
-    for title, controller in controllers.items():
-        controller.title = title
-        if "Checkbox" in str(controller):
-            # traits = dir(controller.layout)
-            # traits = [t for t in traits if t[0] != '_']
-            controller.layout.max_width = "200ex"
-            # controller.layout.min_width = '100ex'
-            # controller.layout.width = '150ex'
 
-    return controllers[opt]
+# The altair.Scale objects made by _scale_of, by (type_, zero)
+_SCALES = {}
 
 
-def _get_plot_command(e):
+def _scale_of(type_, zero):
+    """
+    The altair.Scale for a scale type and zero setting, leaving out the ones
+    that are None. There are only a few of these, so they're shared.
+
+    >>> _scale_of('log', None).to_dict()
+    {'type': 'log'}
+    """
+    scale = _SCALES.get((type_, zero))
+    if scale is None:
+        kwargs = {}
+        if type_ is not None:
+            kwargs["type"] = type_
+        if zero is not None:
+            kwargs["zero"] = zero
+        scale = _SCALES[type_, zero] = altair.Scale(**kwargs)
+    return scale
+
+
+def _get_plot_command(e, types=None):
     """ Given a function, data type and data column name,
-    find the plot command
+    find the plot command. ``types`` gives the type of fields that don't
+    have one.
+
+    >>> e = {'encoding': 'x', 'field': 'petalWidth'}
+    >>> r = _get_plot_command(e, types={'petalWidth': 'quantitative'})
+    >>> assert r.to_dict() == {'field': 'petalWidth', 'type': 'quantitative'}
 
     >>> e = {'encoding': 'x', 'field': 'petalWidth', 'scale': 'log'}
     >>> r = _get_plot_command(e)
     >>> assert r.to_dict() == {'field': 'petalWidth', 'scale': {'type': 'log'}}
     """
-    d = {k: v for k, v in e.items()}
     if "field" not in e:
         return
 
-    encoding = d.pop("encoding")
-    column = d.pop("field")
-
-    scale = {}
-    if any([key in d for key in ["scale", "zero"]]):
-        scale = {
-            "scale": altair.Scale(type=d.pop("scale", None), zero=d.pop("zero", None))
-        }
+    kwargs = {
+        k: v for k, v in e.items() if k not in ("encoding", "field", "scale", "zero")
+    }
+    if "scale" in e or "zero" in e:
+        kwargs["scale"] = _scale_of(e.get("scale"), e.get("zero"))
+    if "type" not in e and types and e["field"] in types:
+        kwargs["type"] = types[e["field"]]
 
-    d.update(scale)
-    return getattr(altair, encoding.capitalize())(column, **d)
+    return _ENC_CTOR[e["encoding"]](e["field"], **kwargs)